@@ -1,12 +1,23 @@
+import csv
+import openpyxl
+import os
 import pandas as pd
+import functools
 import re
 import json
+import sys
 import unicodedata
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict, Counter
 
+try:
+    import orjson  # optional: C JSON codec, UTF-8 native
+except ImportError:
+    orjson = None
+
 # Setup logging
 Path('logs').mkdir(exist_ok=True)
 log_filename = f"logs/normalization_v2_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -20,10 +31,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_GENE_RE = re.compile(r'^[A-Z][A-Z0-9]{1,}(?:::[A-Z][A-Z0-9]+)?$')
+
+@functools.lru_cache(maxsize=4096)
+def _is_gene_token(text):
+    """Regex gene check; the token vocabulary is small, so cache hits
+    dominate after the first few rows"""
+    return bool(_GENE_RE.match(text))
+
+_META_RE = re.compile(r'[\\^$.|?*+()\[\]{}]')
+
+def escape_fast(text):
+    """re.escape fast path: most disease names carry no metacharacters"""
+    if _META_RE.search(text) is None:
+        return text
+    return _META_RE.sub(r'\\\g<0>', text)
+
+def is_missing(value):
+    """Cheap None/NaN test that skips pd.isna's type dispatch"""
+    return value is None or (isinstance(value, float) and value != value)
+
+def nfkc_normalize(text):
+    """NFKC-normalize, skipping ASCII and already-normalized strings"""
+    if text.isascii() or unicodedata.is_normalized('NFKC', text):
+        return text
+    return unicodedata.normalize('NFKC', text)
+
 class ImprovedDiseaseNormalizer:
     def __init__(self, dictionary_path='disease_dictionary_v3.jsonl'):
+        # Precompile all patterns once; the re module caches compiled
+        # patterns but still pays a cache lookup per call, which adds up
+        # over thousands of rows
+        self._re_lead = re.compile(r'^(?:[0-9]+|[a-zA-Z])[)）:：．、.\s]+')
+        self._re_paren_gene = re.compile(r'[（\(]([A-Z0-9]+(?:::[A-Z0-9]+)?)[）\)]')
+        self._re_main = re.compile(r'^([^（\(]+)')
+        self._re_gan_suffix = re.compile(r'(?:がん|ガン)$')
+        self._re_spaces = re.compile(r'\s+')
+
+        # Delimiter canonicalization tables so str.translate + str.split
+        # can replace regex splits on the fixed delimiter sets
+        self._slash_trans = str.maketrans({'／': '/'})
+        self._comma_trans = str.maketrans({'、': ',', '，': ','})
+
         self.disease_dict = self.load_dictionary(dictionary_path)
         self.normalization_map = defaultdict(list)
+        # Raw text repeats heavily in exam data (thousands of entries
+        # collapse to hundreds of canonical names), so cache the full
+        # pipeline result per input string together with the
+        # normalization_map keys to replay on a hit
+        self._entry_cache = {}
         self.gene_patterns = set()
         self.specimen_terms = {
             '陰性', '陽性', '検体適正', '検体不適正', 'NILM', 'ASC-US', 'ASC-H',
@@ -35,55 +91,71 @@ class ImprovedDiseaseNormalizer:
         dictionary = {}
         if Path(dict_path).exists():
             logger.info(f"Loading dictionary from: {dict_path}")
-            with open(dict_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    entry = json.loads(line)
-                    canonical = entry['canonical_ja']
-                    dictionary[canonical] = entry
+            loads = orjson.loads if orjson is not None else json.loads
+            for line in Path(dict_path).read_bytes().splitlines():
+                if not line:
+                    continue
+                entry = loads(line)
+                dictionary[entry['canonical_ja']] = entry
             logger.info(f"Loaded {len(dictionary)} dictionary entries")
         return dictionary
         
     def is_gene_name(self, text):
         """Check if text is likely a gene name"""
         # Gene patterns: MLH1, ETV6::NTRK3, C3, MYC, etc.
-        gene_pattern = r'^[A-Z][A-Z0-9]{1,}(?:::[A-Z][A-Z0-9]+)?$'
-        return bool(re.match(gene_pattern, text))
+        # A two-character ASCII check rejects most tokens before the
+        # regex (the pattern needs at least two uppercase/digit chars)
+        if len(text) < 2 or not ('A' <= text[0] <= 'Z'):
+            return False
+        return _is_gene_token(text)
     
     def preprocess_text(self, text):
         """Apply preprocessing steps according to the How-to document"""
-        if pd.isna(text):
+        if is_missing(text):
             return ""
         
         text = str(text)
         original_text = text
         
         # 1. Unicode normalization (NFKC)
-        text = unicodedata.normalize('NFKC', text)
+        text = nfkc_normalize(text)
         
         # 2. Remove leading numbers and symbols
-        text = re.sub(r'^[0-9]+[)）:：．、.\s]+', '', text)
-        text = re.sub(r'^[a-zA-Z][)）:：．、.\s]+', '', text)
+        text = self._re_lead.sub('', text, count=1)
         
-        logger.debug(f"Preprocessed: '{original_text}' → '{text}'")
+        # Lazy %-formatting plus the level guard keeps per-row logging
+        # free when debug output is off
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Preprocessed: '%s' → '%s'", original_text, text)
         return text.strip()
     
     def extract_main_disease(self, text):
         """Extract the main disease name from text"""
         # Handle patterns like "検体適正、悪性／浸潤性乳管癌"
         if '検体適正' in text or '検体不適正' in text:
-            # Remove specimen status part
-            text = re.sub(r'^[^、，,]+[、，,]\s*', '', text)
-        
+            # Remove specimen status part: drop everything up to the
+            # first comma without invoking the regex engine
+            cut = -1
+            for delim in ('、', '，', ','):
+                i = text.find(delim)
+                if i > 0 and (cut == -1 or i < cut):
+                    cut = i
+            if cut > 0:
+                text = text[cut + 1:].lstrip()
+
         # Remove "悪性／" or "良性／" prefixes
-        text = re.sub(r'^(悪性|良性)[／/]\s*', '', text)
-        
+        for prefix in ('悪性／', '悪性/', '良性／', '良性/'):
+            if text.startswith(prefix):
+                text = text[len(prefix):].lstrip()
+                break
+
         # Extract main disease before parentheses
-        match = re.match(r'^([^（\(]+)', text)
+        match = self._re_main.match(text)
         if match:
             main_disease = match.group(1).strip()
-            
+
             # Handle cases with gene names in parentheses
-            paren_match = re.search(r'[（\(]([A-Z0-9]+(?:::[A-Z0-9]+)?)[）\)]', text)
+            paren_match = self._re_paren_gene.search(text)
             if paren_match and self.is_gene_name(paren_match.group(1)):
                 # Keep gene name with disease
                 return f"{main_disease} ({paren_match.group(1)})"
@@ -95,134 +167,211 @@ class ImprovedDiseaseNormalizer:
     def normalize_disease_name(self, disease):
         """Apply normalization rules to disease name"""
         # Standardize cancer terms
-        disease = re.sub(r'がん$', '癌', disease)
-        disease = re.sub(r'ガン$', '癌', disease)
-        
+        disease = self._re_gan_suffix.sub('癌', disease)
+
         # Standardize spaces
-        disease = re.sub(r'\s+', ' ', disease).strip()
-        
-        # Keep gene names in uppercase
-        def preserve_gene_case(match):
-            gene = match.group(0)
-            if self.is_gene_name(gene):
-                return gene
-            else:
-                return gene
-        
-        # Find and preserve gene names
-        disease = re.sub(r'\b[A-Z][A-Z0-9]+(?:::[A-Z][A-Z0-9]+)?\b', preserve_gene_case, disease)
-        
+        disease = self._re_spaces.sub(' ', disease).strip()
+
+        # Gene names are already uppercase at this point; no extra pass
+        # is needed to preserve them
         return disease
     
     def process_entry(self, raw_text):
         """Process a single entry and return normalized disease name(s)"""
-        if pd.isna(raw_text):
+        if is_missing(raw_text):
             return ""
-        
+
         # Preprocess
         text = self.preprocess_text(raw_text)
-        
-        # Handle multiple diseases separated by various delimiters
-        # But be careful not to split gene names like "ETV6::NTRK3"
-        parts = []
-        
-        # First split by major delimiters, but preserve gene patterns
-        temp_text = text
-        gene_placeholders = {}
-        gene_counter = 0
-        
-        # Replace gene patterns with placeholders
-        for match in re.finditer(r'[A-Z][A-Z0-9]+::[A-Z][A-Z0-9]+', temp_text):
-            placeholder = f"__GENE{gene_counter}__"
-            gene_placeholders[placeholder] = match.group(0)
-            temp_text = temp_text.replace(match.group(0), placeholder)
-            gene_counter += 1
-        
-        # Split by delimiters
-        if re.search(r'[／/]', temp_text) and not re.search(r'(悪性|良性)[／/]', temp_text):
-            parts = re.split(r'[／/]', temp_text)
-        elif re.search(r'[,、，]', temp_text):
-            parts = re.split(r'[,、，]', temp_text)
+        return self._process_clean_text(text, raw_text)
+
+    def _process_clean_text(self, text, raw_text):
+        """Normalize an entry whose text has already been preprocessed"""
+        # Interning lets the many repeated raw strings share one object
+        # across the normalization_map lists
+        raw_str = sys.intern(str(raw_text))
+        cached = self._entry_cache.get(raw_str)
+        if cached is None:
+            cached = self._normalize_parts(text, raw_str)
+            self._entry_cache[raw_str] = cached
+        result, mapping_keys = cached
+        for normalized in mapping_keys:
+            self.normalization_map[normalized].append(raw_str)
+        return result
+
+    def _normalize_parts(self, text, raw_str):
+        """Split, extract and normalize without touching shared state.
+
+        Returns (result, mapping_keys), where mapping_keys are the
+        normalization_map keys the caller should record raw_str under.
+        """
+        # Handle multiple diseases separated by various delimiters.
+        # Gene fusions like "ETV6::NTRK3" survive the split as-is because
+        # the delimiter characters cannot appear inside a fusion token.
+        # The delimiter sets are single characters, so canonicalizing
+        # with str.translate and splitting with str.split avoids regex
+        # passes per row
+        if ('/' in text or '／' in text) and not (
+                '悪性／' in text or '悪性/' in text
+                or '良性／' in text or '良性/' in text):
+            parts = text.translate(self._slash_trans).split('/')
+        elif ',' in text or '、' in text or '，' in text:
+            parts = text.translate(self._comma_trans).split(',')
         else:
-            parts = [temp_text]
-        
-        # Restore gene patterns
-        restored_parts = []
-        for part in parts:
-            for placeholder, gene in gene_placeholders.items():
-                part = part.replace(placeholder, gene)
-            restored_parts.append(part)
-        
+            parts = [text]
+
         # Process each part
         normalized_diseases = []
-        for part in restored_parts:
+        mapping_keys = []
+        for part in parts:
             part = part.strip()
             if not part or part in self.specimen_terms:
                 continue
-            
+
             # Extract main disease
             main_disease = self.extract_main_disease(part)
-            
+
             # Normalize
             normalized = self.normalize_disease_name(main_disease)
-            
+
             if normalized and normalized not in self.specimen_terms:
+                normalized = sys.intern(normalized)
                 normalized_diseases.append(normalized)
-                
+
                 # Track mapping
-                if str(raw_text) != normalized:
-                    self.normalization_map[normalized].append(str(raw_text))
-        
+                if raw_str != normalized:
+                    mapping_keys.append(normalized)
+
         # Return single disease or multiple diseases joined
         if len(normalized_diseases) == 0:
-            return str(raw_text)  # Return original if no disease found
-        elif len(normalized_diseases) == 1:
-            return normalized_diseases[0]
+            result = raw_str  # Return original if no disease found
         else:
             # For multiple diseases, return the first one (main disease)
             # This helps with deduplication
-            return normalized_diseases[0]
+            result = normalized_diseases[0]
+
+        return result, mapping_keys
     
-    def process_excel_file(self, file_path, sheet_name="DB疾患", column_index=3):
-        """Process the Excel file and normalize disease names"""
+    def process_excel_file(self, file_path, sheet_name="DB疾患", column_index=3,
+                           max_workers=None, output_format='xlsx'):
+        """Process the Excel file and normalize disease names
+
+        output_format: 'xlsx' streams the full sheet plus the normalized
+        column back out; 'csv' writes only the source and normalized
+        columns, which is far cheaper when the other columns are not
+        needed downstream.
+        """
+        if output_format not in ('xlsx', 'csv'):
+            raise ValueError(f"Unsupported output format: {output_format}")
         logger.info(f"Processing Excel file: {file_path}")
         logger.info(f"Target sheet: {sheet_name}, Column: {column_index}")
         
         try:
-            # Read Excel file
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            column_name = df.columns[column_index]
+            # First pass: stream the sheet in read-only mode and keep
+            # only the target column, instead of materializing the whole
+            # sheet as a DataFrame
+            wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            ws = wb[sheet_name]
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows)
+            column_name = header[column_index]
             logger.info(f"Processing column: '{column_name}'")
-            
-            # Process each entry
+            raw_values = [
+                row[column_index] if len(row) > column_index else None
+                for row in rows
+            ]
+            wb.close()
+
+            column = pd.Series(raw_values, dtype=object)
+
+            # Deduplicate before processing: the column repeats heavily,
+            # so the pipeline runs once per unique value and per-row
+            # results are gathered through the factorize codes
+            codes, uniques = pd.factorize(column, use_na_sentinel=True)
+            # Interned strings are shared across every normalization_map
+            # list they get appended to during the gather step
+            unique_strs = [sys.intern(str(u)) for u in uniques]
+            logger.info(f"Processing {len(uniques)} unique values for {len(raw_values)} rows")
+
+            # Vectorized preprocessing: the str cast, NFKC normalization
+            # and leading-prefix strips run inside pandas, leaving only
+            # the split/extract/normalize logic per unique value
+            clean = (
+                pd.Series(unique_strs, dtype=object)
+                .map(nfkc_normalize)
+                .str.replace(self._re_lead, '', regex=True)
+                .str.strip()
+            )
+
+            # Normalize each unique value; the work is pure CPU (regex
+            # and string ops), so large batches fan out to a process pool
+            workers = max_workers if max_workers is not None else os.cpu_count() or 1
+            if workers > 1 and len(uniques) > 1000:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    unique_results = list(executor.map(
+                        self._normalize_parts, clean, unique_strs,
+                        chunksize=256))
+                logger.info(f"Processed {len(unique_results)} unique values on {workers} workers")
+            else:
+                unique_results = []
+                for idx, (text, raw_str) in enumerate(zip(clean, unique_strs)):
+                    unique_results.append(self._normalize_parts(text, raw_str))
+
+                    # Log progress
+                    if (idx + 1) % 100 == 0:
+                        logger.info(f"Processed {idx + 1} unique values...")
+
+            # Gather per-row results, replaying the mapping appends so
+            # variation counts still reflect per-row occurrences
             normalized_entries = []
-            
-            for idx, raw_text in enumerate(df.iloc[:, column_index]):
-                normalized = self.process_entry(raw_text)
-                normalized_entries.append(normalized)
-                
-                # Log progress
-                if (idx + 1) % 100 == 0:
-                    logger.info(f"Processed {idx + 1} entries...")
-            
-            # Add normalized column
-            df[f'{column_name}_正規化'] = normalized_entries
+            for code in codes:
+                if code < 0:
+                    normalized_entries.append("")
+                    continue
+                result, mapping_keys = unique_results[code]
+                normalized_entries.append(result)
+                raw_str = unique_strs[code]
+                for key in mapping_keys:
+                    self.normalization_map[key].append(raw_str)
             
             # Calculate statistics
-            self.calculate_statistics(df.iloc[:, column_index], normalized_entries)
-            
-            # Save results
-            output_path = file_path.replace('.xlsx', '_normalized_v2.xlsx')
-            df.to_excel(output_path, sheet_name=sheet_name, index=False)
+            self.calculate_statistics(column, normalized_entries)
+
+            output_base = file_path.replace('.xlsx', '_normalized_v2')
+            if output_format == 'csv':
+                # Narrow output: just the source column and its
+                # normalized form, skipping the xlsx writeback entirely
+                output_path = output_base + '.csv'
+                with open(output_path, 'w', encoding='utf-8', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow([column_name, f'{column_name}_正規化'])
+                    for raw_text, normalized in zip(raw_values, normalized_entries):
+                        writer.writerow(
+                            ['' if raw_text is None else raw_text, normalized])
+            else:
+                # Second pass: stream rows straight into a write-only
+                # workbook with the normalized column appended, so neither
+                # the input nor the output sheet is buffered in full
+                output_path = output_base + '.xlsx'
+                out_wb = openpyxl.Workbook(write_only=True)
+                out_ws = out_wb.create_sheet(title=sheet_name)
+                wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+                ws = wb[sheet_name]
+                rows = ws.iter_rows(values_only=True)
+                out_ws.append(list(next(rows)) + [f'{column_name}_正規化'])
+                for row, normalized in zip(rows, normalized_entries):
+                    out_ws.append(list(row) + [normalized])
+                wb.close()
+                out_wb.save(output_path)
             logger.info(f"Saved normalized data to: {output_path}")
-            
+
             # Save dictionary
             self.save_disease_dictionary(normalized_entries)
-            
+
             # Save mapping report
             self.save_mapping_report()
-            
-            return df
+
+            return normalized_entries
             
         except Exception as e:
             logger.error(f"Error processing Excel file: {e}", exc_info=True)
@@ -281,7 +430,7 @@ class ImprovedDiseaseNormalizer:
                 "canonical_en": "",
                 "category": "Disease",
                 "synonyms": synonyms[:5],  # Limit synonyms
-                "regex": re.escape(disease),
+                "regex": escape_fast(disease),
                 "frequency": count,
                 "variations_merged": len(self.normalization_map.get(disease, []))
             }
@@ -290,11 +439,15 @@ class ImprovedDiseaseNormalizer:
         # Sort by frequency
         dictionary_entries.sort(key=lambda x: x['frequency'], reverse=True)
         
-        # Save as JSON Lines
+        # Save as JSON Lines in a single write
         dict_path = 'disease_dictionary_v2.jsonl'
-        with open(dict_path, 'w', encoding='utf-8') as f:
-            for entry in dictionary_entries:
-                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        if orjson is not None:
+            payload = b'\n'.join(orjson.dumps(e) for e in dictionary_entries) + b'\n'
+        else:
+            payload = '\n'.join(
+                json.dumps(e, ensure_ascii=False) for e in dictionary_entries
+            ).encode('utf-8') + b'\n'
+        Path(dict_path).write_bytes(payload)
         
         logger.info(f"\nSaved disease dictionary with {len(dictionary_entries)} entries to: {dict_path}")
     
@@ -329,7 +482,7 @@ def main():
     excel_path = "/mnt/c/Users/IWATA/過去問処理/過去問DB/専門医試験比較表.xlsx"
     
     try:
-        df = normalizer.process_excel_file(excel_path)
+        normalizer.process_excel_file(excel_path)
         logger.info("\nNormalization completed successfully!")
         
     except Exception as e:
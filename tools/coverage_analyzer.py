@@ -7,6 +7,16 @@ from pathlib import Path
 from datetime import datetime
 from collections import defaultdict, Counter
 
+try:
+    import ahocorasick  # pyahocorasick: optional, enables fast matching
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson  # optional: C JSON codec, UTF-8 native
+except ImportError:
+    orjson = None
+
 # Setup logging
 Path('logs').mkdir(exist_ok=True)
 log_filename = f"logs/coverage_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -20,8 +30,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_META_RE = re.compile(r'[\\^$.|?*+()\[\]{}]')
+
+def escape_fast(text):
+    """re.escape fast path: most disease names carry no metacharacters"""
+    if _META_RE.search(text) is None:
+        return text
+    return _META_RE.sub(r'\\\g<0>', text)
+
+def nfkc_normalize(text):
+    """NFKC-normalize, skipping ASCII and already-normalized strings"""
+    if text.isascii() or unicodedata.is_normalized('NFKC', text):
+        return text
+    return unicodedata.normalize('NFKC', text)
+
 class DictionaryCoverageAnalyzer:
     def __init__(self, dictionary_path='final_output/disease_dictionary_v2.jsonl'):
+        # Precompile all patterns once instead of paying the re module's
+        # per-call cache lookup for every row
+        self._re_lead = re.compile(r'^(?:[0-9]+|[a-zA-Z])[)）:：．、.\s]+')
+        self._re_specimen_prefix = re.compile(r'^(検体適正|検体不適正)[、，,]\s*')
+        self._re_benign_malignant = re.compile(r'^(悪性|良性)[／/]\s*')
+        self._re_gene = re.compile(r'[A-Z][A-Z0-9]+(?:::[A-Z][A-Z0-9]+)?')
+        self._re_paren_gene = re.compile(r'[（\(]([A-Z][A-Z0-9]+(?:::[A-Z][A-Z0-9]+)?)[）\)]')
+        self._re_main = re.compile(r'^([^（\(]+)')
+        self._re_delim = re.compile(r'[／/,、，・;]')
+
         self.dictionary = self.load_dictionary(dictionary_path)
         self.coverage_stats = {}
         self.uncovered_terms = []
@@ -30,27 +64,46 @@ class DictionaryCoverageAnalyzer:
     def load_dictionary(self, dict_path):
         """Load disease dictionary from JSONL file"""
         dictionary = {}
-        patterns = []
-        
+
         logger.info(f"Loading dictionary from: {dict_path}")
-        
-        with open(dict_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                entry = json.loads(line)
+
+        loads = orjson.loads if orjson is not None else json.loads
+        for line in Path(dict_path).read_bytes().splitlines():
+            if line:
+                entry = loads(line)
                 canonical = entry['canonical_ja']
                 dictionary[canonical] = entry
-                
-                # Create regex patterns for matching
-                patterns.append({
-                    'canonical': canonical,
-                    'regex': entry.get('regex', re.escape(canonical)),
-                    'synonyms': entry.get('synonyms', [canonical])
-                })
-        
+
+                # Precompile the matching regex once; a broken pattern is
+                # reported here instead of being swallowed per term
+                try:
+                    entry['_compiled'] = re.compile(
+                        entry.get('regex', escape_fast(canonical)), re.IGNORECASE)
+                except re.error:
+                    logger.warning(f"Invalid regex for '{canonical}', skipping pattern")
+                    entry['_compiled'] = None
+
+        # Build an Aho-Corasick automaton over canonicals and synonyms so
+        # check_coverage does one linear scan per term instead of looping
+        # over every dictionary entry
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for canonical, entry in dictionary.items():
+                self._automaton.add_word(canonical, (len(canonical), 'exact_match'))
+                for synonym in entry.get('synonyms', []):
+                    if synonym and synonym != canonical:
+                        self._automaton.add_word(synonym, (len(synonym), 'synonym_match'))
+            self._automaton.make_automaton()
+
+        # One C-level scan over this haystack answers "is the term a
+        # substring of any canonical"; the \x1f separators prevent
+        # matches spanning two entries
+        self._canonicals_joined = '\x1f'.join(dictionary)
+
         logger.info(f"Loaded {len(dictionary)} dictionary entries")
         return {
-            'entries': dictionary,
-            'patterns': patterns
+            'entries': dictionary
         }
     
     def normalize_text(self, text):
@@ -61,15 +114,14 @@ class DictionaryCoverageAnalyzer:
         text = str(text)
         
         # Unicode normalization
-        text = unicodedata.normalize('NFKC', text)
+        text = nfkc_normalize(text)
         
         # Remove leading numbers and symbols
-        text = re.sub(r'^[0-9]+[)）:：．、.\s]+', '', text)
-        text = re.sub(r'^[a-zA-Z][)）:：．、.\s]+', '', text)
-        
+        text = self._re_lead.sub('', text, count=1)
+
         # Remove specimen status prefix
-        text = re.sub(r'^(検体適正|検体不適正)[、，,]\s*', '', text)
-        text = re.sub(r'^(悪性|良性)[／/]\s*', '', text)
+        text = self._re_specimen_prefix.sub('', text)
+        text = self._re_benign_malignant.sub('', text)
         
         return text.strip()
     
@@ -83,16 +135,15 @@ class DictionaryCoverageAnalyzer:
         terms = []
         
         # Handle gene patterns specially
-        gene_pattern = r'[A-Z][A-Z0-9]+(?:::[A-Z][A-Z0-9]+)?'
-        gene_matches = re.findall(gene_pattern, normalized)
-        
+        gene_matches = self._re_gene.findall(normalized)
+
         # Replace genes with placeholders
         temp_text = normalized
         for i, gene in enumerate(gene_matches):
             temp_text = temp_text.replace(gene, f"__GENE{i}__")
-        
+
         # Split by delimiters
-        parts = re.split(r'[／/,、，・;]', temp_text)
+        parts = self._re_delim.split(temp_text)
         
         for part in parts:
             # Restore genes
@@ -102,13 +153,13 @@ class DictionaryCoverageAnalyzer:
             part = part.strip()
             if part and len(part) > 1:
                 # Extract main disease name (before parentheses)
-                match = re.match(r'^([^（\(]+)', part)
+                match = self._re_main.match(part)
                 if match:
                     main_term = match.group(1).strip()
                     terms.append(main_term)
-                    
+
                     # Check for gene in parentheses
-                    gene_in_paren = re.search(r'[（\(](' + gene_pattern + r')[）\)]', part)
+                    gene_in_paren = self._re_paren_gene.search(part)
                     if gene_in_paren:
                         terms.append(f"{main_term} ({gene_in_paren.group(1)})")
                 else:
@@ -121,26 +172,40 @@ class DictionaryCoverageAnalyzer:
         # Direct match
         if term in self.dictionary['entries']:
             return True, 'exact_match'
-        
-        # Pattern match
-        for pattern in self.dictionary['patterns']:
+
+        # Automaton pass: finds any canonical or synonym occurring inside
+        # the term in O(len(term))
+        if self._automaton is not None:
+            partial_hit = False
+            for _end, (length, match_type) in self._automaton.iter(term):
+                if length == len(term):
+                    return True, match_type
+                partial_hit = True
+            if partial_hit:
+                return True, 'partial_match'
+            if term in self._canonicals_joined:
+                return True, 'partial_match'
+            return False, 'not_covered'
+
+        # Fallback pattern match when pyahocorasick is unavailable
+        for entry in self.dictionary['entries'].values():
             # Check synonyms
-            if term in pattern['synonyms']:
+            if term in entry.get('synonyms', ()):
                 return True, 'synonym_match'
-            
+
             # Regex match
-            try:
-                if re.match(pattern['regex'], term, re.IGNORECASE):
-                    return True, 'regex_match'
-            except:
-                pass
-        
-        # Partial match check (for compound terms)
-        for entry in self.dictionary['entries'].values():
-            canonical = entry['canonical_ja']
-            if canonical in term or term in canonical:
+            compiled = entry['_compiled']
+            if compiled is not None and compiled.match(term):
+                return True, 'regex_match'
+
+        # Partial match check (for compound terms); the term-in-canonical
+        # direction is one substring scan over the joined haystack
+        if term in self._canonicals_joined:
+            return True, 'partial_match'
+        for canonical in self.dictionary['entries']:
+            if canonical in term:
                 return True, 'partial_match'
-        
+
         return False, 'not_covered'
     
     def analyze_excel_coverage(self, excel_path, sheet_name="DB疾患", column_index=3):
@@ -225,7 +290,7 @@ class DictionaryCoverageAnalyzer:
                 "canonical_en": "",
                 "category": "Disease",
                 "synonyms": [term],
-                "regex": re.escape(term),
+                "regex": escape_fast(term),
                 "frequency": self.new_terms[term],
                 "status": "new",
                 "added_date": datetime.now().isoformat()
@@ -234,11 +299,15 @@ class DictionaryCoverageAnalyzer:
         
         # Sort by frequency
         new_entries.sort(key=lambda x: x['frequency'], reverse=True)
-        
-        # Save to JSONL
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for entry in new_entries:
-                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+        # Save to JSONL in a single write
+        if orjson is not None:
+            payload = b'\n'.join(orjson.dumps(e) for e in new_entries) + b'\n'
+        else:
+            payload = '\n'.join(
+                json.dumps(e, ensure_ascii=False) for e in new_entries
+            ).encode('utf-8') + b'\n'
+        Path(output_path).write_bytes(payload)
         
         logger.info(f"Saved {len(new_entries)} new words to {output_path}")
         
@@ -6,14 +6,34 @@ A comprehensive CLI tool for maintaining the disease dictionary.
 Provides statistics, validation, and interactive editing capabilities.
 """
 
+import heapq
 import json
+import multiprocessing
+import os
 import re
 import argparse
 import logging
+import shutil
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from collections import Counter, defaultdict
 
+try:
+    import numpy as np  # optional: vectorized statistics
+except ImportError:
+    np = None
+
+try:
+    import orjson  # optional: C JSON codec, UTF-8 native
+except ImportError:
+    orjson = None
+
+try:
+    import numba  # optional: JIT for the numeric summary loop
+except ImportError:
+    numba = None
+
 # Setup logging
 Path('logs').mkdir(exist_ok=True)
 log_filename = f"logs/dict_maintenance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -27,69 +47,272 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+REQUIRED_FIELDS = ('canonical_ja', 'category', 'synonyms', 'regex')
+
+# Below this size the worker start-up cost outweighs parallel decoding
+_PARALLEL_LOAD_THRESHOLD = 32 * 1024 * 1024
+
+def _parse_byte_range(args):
+    """Worker: decode the JSONL lines whose first byte falls in [start, end).
+
+    A line is owned by the range its first byte lands in. A worker
+    starting mid-line skips ahead to the next line start; one starting
+    exactly on a line start keeps that line, because the previous worker
+    stops before reading it. Returns the decoded rows plus any
+    decode-error messages for the main process to log.
+    """
+    path, start, end = args
+    loads = orjson.loads if orjson is not None else json.loads
+    rows = []
+    errors = []
+    # 1 MiB buffer: the worker streams its range line by line, and the
+    # default 8 KiB buffer would cost a syscall every few lines
+    with open(path, 'rb', buffering=1 << 20) as f:
+        if start:
+            # Peek at the byte before the range: only when it is not a
+            # newline does start sit mid-line, making the first readline
+            # a partial tail that belongs to the previous worker
+            f.seek(start - 1)
+            if f.read(1) != b'\n':
+                f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(loads(line))
+            except ValueError as e:
+                errors.append(str(e))
+    return rows, errors
+
+def _summarize_arrays(freqs, variations):
+    """Totals plus frequency-bucket counts in one pass over the arrays.
+
+    Compiled with numba when available; the loop form JITs to a single
+    branch-per-element scan, beating separate sum/histogram passes once
+    the dictionary is large.
+    """
+    total_freq = 0
+    total_var = 0
+    b1 = b2 = b3 = b4 = b5 = 0
+    for i in range(len(freqs)):
+        f = freqs[i]
+        total_freq += f
+        total_var += variations[i]
+        if f == 1:
+            b1 += 1
+        elif 2 <= f <= 5:
+            b2 += 1
+        elif 6 <= f <= 10:
+            b3 += 1
+        elif 11 <= f <= 20:
+            b4 += 1
+        elif f > 20:
+            b5 += 1
+    return total_freq, total_var, b1, b2, b3, b4, b5
+
+if numba is not None:
+    _summarize_arrays = numba.njit(cache=True)(_summarize_arrays)
+
+@dataclass(slots=True)
+class DictEntry:
+    """Compact in-memory dictionary entry.
+
+    A slotted object is several times smaller than the ~10-key dict each
+    JSONL row decodes to, and attribute access replaces the .get calls
+    on the hot statistics/validation loops. missing_fields records which
+    required keys were absent in the source row for validation.
+    """
+    canonical_ja: str = ''
+    canonical_en: str = ''
+    category: str = 'Unknown'
+    synonyms: list = field(default_factory=list)
+    regex: str = ''
+    frequency: int = 0
+    variations_merged: int = 0
+    status: str = ''
+    added_date: str = ''
+    missing_fields: tuple = ()
+
 class DictionaryMaintenanceTool:
     def __init__(self, dictionary_path='final_output/disease_dictionary_v3.jsonl'):
         self.dictionary_path = dictionary_path
         self.dictionary = self.load_dictionary()
         self.stats = {}
+        self._search_index = None
         
     def load_dictionary(self):
         """Load the dictionary from JSONL file"""
-        dictionary = {}
         try:
-            with open(self.dictionary_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    try:
-                        entry = json.loads(line)
-                        canonical = entry['canonical_ja']
-                        dictionary[canonical] = entry
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON error on line {line_num}: {e}")
-                        continue
+            size = os.stat(self.dictionary_path).st_size
         except FileNotFoundError:
             logger.error(f"Dictionary file not found: {self.dictionary_path}")
             return {}
-        
+
+        workers = os.cpu_count() or 1
+        if size >= _PARALLEL_LOAD_THRESHOLD and workers > 1:
+            rows = self._parse_rows_parallel(size, workers)
+        else:
+            rows = self._parse_rows_serial()
+
+        dictionary = {}
+        for raw in rows:
+            entry = DictEntry(
+                canonical_ja=raw.get('canonical_ja', ''),
+                canonical_en=raw.get('canonical_en', ''),
+                category=raw.get('category', 'Unknown'),
+                synonyms=raw.get('synonyms', []),
+                regex=raw.get('regex', ''),
+                frequency=raw.get('frequency', 0),
+                variations_merged=raw.get('variations_merged', 0),
+                status=raw.get('status', ''),
+                added_date=raw.get('added_date', ''),
+                missing_fields=tuple(
+                    name for name in REQUIRED_FIELDS if name not in raw),
+            )
+            dictionary[entry.canonical_ja] = entry
+
         logger.info(f"Loaded {len(dictionary)} dictionary entries")
         return dictionary
+
+    def _parse_rows_serial(self):
+        """Decode the whole JSONL file in-process"""
+        loads = orjson.loads if orjson is not None else json.loads
+        rows = []
+        data = Path(self.dictionary_path).read_bytes()
+        for line_num, line in enumerate(data.splitlines(), 1):
+            if not line:
+                continue
+            try:
+                rows.append(loads(line))
+            except ValueError as e:  # covers json and orjson decode errors
+                logger.error(f"JSON error on line {line_num}: {e}")
+        return rows
+
+    def _parse_rows_parallel(self, size, workers):
+        """Decode a large JSONL file across worker processes.
+
+        The file is split into byte ranges rounded to line boundaries by
+        the workers themselves; json decoding is CPU-bound, so this
+        scales close to linearly for multi-hundred-MB dictionaries.
+        """
+        chunk = size // workers
+        ranges = [
+            (self.dictionary_path, i * chunk,
+             size if i == workers - 1 else (i + 1) * chunk)
+            for i in range(workers)
+        ]
+        rows = []
+        with multiprocessing.Pool(workers) as pool:
+            for chunk_rows, errors in pool.map(_parse_byte_range, ranges):
+                rows.extend(chunk_rows)
+                for message in errors:
+                    logger.error(f"JSON error: {message}")
+        return rows
     
     def calculate_stats(self):
         """Calculate comprehensive dictionary statistics"""
-        total_entries = len(self.dictionary)
-        total_frequency = sum(entry.get('frequency', 0) for entry in self.dictionary.values())
-        total_variations = sum(entry.get('variations_merged', 0) for entry in self.dictionary.values())
-        
-        # Category breakdown
-        categories = Counter(entry.get('category', 'Unknown') for entry in self.dictionary.values())
-        
-        # Frequency distribution
-        frequencies = [entry.get('frequency', 0) for entry in self.dictionary.values()]
-        freq_ranges = {
-            '1': sum(1 for f in frequencies if f == 1),
-            '2-5': sum(1 for f in frequencies if 2 <= f <= 5),
-            '6-10': sum(1 for f in frequencies if 6 <= f <= 10),
-            '11-20': sum(1 for f in frequencies if 11 <= f <= 20),
-            '20+': sum(1 for f in frequencies if f > 20)
+        if np is not None and self.dictionary:
+            return self._calculate_stats_numpy()
+        return self._calculate_stats_python()
+
+    def _calculate_stats_numpy(self):
+        """Vectorized statistics over dense frequency/variation arrays"""
+        names = list(self.dictionary)
+        n = len(names)
+        freqs = np.fromiter(
+            (e.frequency for e in self.dictionary.values()),
+            dtype=np.int64, count=n)
+        variations = np.fromiter(
+            (e.variations_merged for e in self.dictionary.values()),
+            dtype=np.int64, count=n)
+        synonym_counts = np.fromiter(
+            (len(e.synonyms) for e in self.dictionary.values()),
+            dtype=np.int64, count=n)
+        categories = Counter(e.category for e in self.dictionary.values())
+
+        if numba is not None:
+            # One JIT'd pass yields the totals and all five buckets
+            total_freq, total_var, *bucket_counts = _summarize_arrays(
+                freqs, variations)
+        else:
+            total_freq = int(freqs.sum())
+            total_var = int(variations.sum())
+            # Bucket edges mirror the if/elif ladder: 1, 2-5, 6-10,
+            # 11-20, 20+; zero-frequency entries fall outside all buckets
+            hist, _ = np.histogram(freqs, bins=[1, 2, 6, 11, 21, np.inf])
+            bucket_counts = hist.astype(int).tolist()
+        freq_ranges = dict(zip(('1', '2-5', '6-10', '11-20', '20+'),
+                               bucket_counts))
+
+        # Top-10 selection via argpartition instead of a full sort
+        k = min(10, n)
+        top_freq_idx = np.argpartition(freqs, -k)[-k:]
+        top_freq_idx = top_freq_idx[np.argsort(-freqs[top_freq_idx])]
+        top_var_idx = np.argpartition(variations, -k)[-k:]
+        top_var_idx = top_var_idx[np.argsort(-variations[top_var_idx])]
+
+        self.stats = {
+            'total_entries': n,
+            'total_frequency': int(total_freq),
+            'total_variations_merged': int(total_var),
+            'categories': dict(categories),
+            'frequency_ranges': freq_ranges,
+            'average_synonyms': round(float(synonym_counts.mean()), 2),
+            'top_by_frequency': [(names[i], int(freqs[i])) for i in top_freq_idx],
+            'top_by_variations': [(names[i], int(variations[i])) for i in top_var_idx]
         }
-        
-        # Synonym statistics
-        synonym_counts = [len(entry.get('synonyms', [])) for entry in self.dictionary.values()]
-        avg_synonyms = sum(synonym_counts) / len(synonym_counts) if synonym_counts else 0
-        
-        # Top entries by frequency
-        top_by_freq = sorted(
-            self.dictionary.items(),
-            key=lambda x: x[1].get('frequency', 0),
-            reverse=True
-        )[:10]
-        
-        # Entries with most variations merged
-        top_by_variations = sorted(
-            self.dictionary.items(),
-            key=lambda x: x[1].get('variations_merged', 0),
-            reverse=True
-        )[:10]
-        
+
+        return self.stats
+
+    def _calculate_stats_python(self):
+        """Single-pass statistics fallback when numpy is unavailable"""
+        total_entries = len(self.dictionary)
+        total_frequency = 0
+        total_variations = 0
+        categories = Counter()
+        freq_buckets = [0, 0, 0, 0, 0]
+        synonym_total = 0
+        top_freq_heap = []
+        top_var_heap = []
+
+        # Single pass over the dictionary: every aggregate accumulates in
+        # one loop, and the two top-10 lists are size-bounded heaps
+        # instead of full sorts of all entries
+        for name, entry in self.dictionary.items():
+            freq = entry.frequency
+            variations = entry.variations_merged
+            total_frequency += freq
+            total_variations += variations
+            categories[entry.category] += 1
+            synonym_total += len(entry.synonyms)
+
+            if freq == 1:
+                freq_buckets[0] += 1
+            elif 2 <= freq <= 5:
+                freq_buckets[1] += 1
+            elif 6 <= freq <= 10:
+                freq_buckets[2] += 1
+            elif 11 <= freq <= 20:
+                freq_buckets[3] += 1
+            elif freq > 20:
+                freq_buckets[4] += 1
+
+            if len(top_freq_heap) < 10:
+                heapq.heappush(top_freq_heap, (freq, name))
+            else:
+                heapq.heappushpop(top_freq_heap, (freq, name))
+            if len(top_var_heap) < 10:
+                heapq.heappush(top_var_heap, (variations, name))
+            else:
+                heapq.heappushpop(top_var_heap, (variations, name))
+
+        avg_synonyms = synonym_total / total_entries if total_entries else 0
+        freq_ranges = dict(zip(('1', '2-5', '6-10', '11-20', '20+'), freq_buckets))
+
         self.stats = {
             'total_entries': total_entries,
             'total_frequency': total_frequency,
@@ -97,10 +320,10 @@ class DictionaryMaintenanceTool:
             'categories': dict(categories),
             'frequency_ranges': freq_ranges,
             'average_synonyms': round(avg_synonyms, 2),
-            'top_by_frequency': [(name, data.get('frequency', 0)) for name, data in top_by_freq],
-            'top_by_variations': [(name, data.get('variations_merged', 0)) for name, data in top_by_variations]
+            'top_by_frequency': [(name, freq) for freq, name in sorted(top_freq_heap, reverse=True)],
+            'top_by_variations': [(name, variations) for variations, name in sorted(top_var_heap, reverse=True)]
         }
-        
+
         return self.stats
     
     def print_stats(self):
@@ -138,47 +361,60 @@ class DictionaryMaintenanceTool:
     def validate_dictionary(self):
         """Validate dictionary entries and report issues"""
         issues = defaultdict(list)
-        
+        total_issues = 0
+        # Validity per pattern string; duplicate patterns across entries
+        # compile once instead of churning re's internal cache
+        regex_validity = {}
+
         for canonical, entry in self.dictionary.items():
-            # Check required fields
-            required_fields = ['canonical_ja', 'category', 'synonyms', 'regex']
-            for field in required_fields:
-                if field not in entry:
-                    issues['missing_fields'].append((canonical, field))
-            
+            # Check required fields (recorded at load time)
+            for field_name in entry.missing_fields:
+                issues['missing_fields'].append((canonical, field_name))
+                total_issues += 1
+
             # Check canonical_ja matches key
-            if entry.get('canonical_ja') != canonical:
+            if entry.canonical_ja != canonical:
                 issues['canonical_mismatch'].append(canonical)
-            
+                total_issues += 1
+
             # Check synonyms list
-            synonyms = entry.get('synonyms', [])
+            synonyms = entry.synonyms
             if not isinstance(synonyms, list):
                 issues['invalid_synonyms'].append(canonical)
+                total_issues += 1
             elif len(synonyms) == 0:
                 issues['empty_synonyms'].append(canonical)
+                total_issues += 1
             
             # Check regex validity
-            regex_pattern = entry.get('regex', '')
+            regex_pattern = entry.regex
             if regex_pattern:
-                try:
-                    re.compile(regex_pattern)
-                except re.error:
+                valid = regex_validity.get(regex_pattern)
+                if valid is None:
+                    try:
+                        re.compile(regex_pattern)
+                        valid = True
+                    except re.error:
+                        valid = False
+                    regex_validity[regex_pattern] = valid
+                if not valid:
                     issues['invalid_regex'].append((canonical, regex_pattern))
-            
+                    total_issues += 1
+
             # Check frequency
-            frequency = entry.get('frequency', 0)
+            frequency = entry.frequency
             if not isinstance(frequency, int) or frequency < 0:
                 issues['invalid_frequency'].append((canonical, frequency))
+                total_issues += 1
         
         # Print validation results
         print("\n" + "="*60)
         print("✅ DICTIONARY VALIDATION RESULTS")
         print("="*60)
         
-        if not any(issues.values()):
+        if total_issues == 0:
             print("\n🎉 No issues found! Dictionary is valid.")
         else:
-            total_issues = sum(len(issue_list) for issue_list in issues.values())
             print(f"\n⚠️  Found {total_issues} issues:")
             
             for issue_type, issue_list in issues.items():
@@ -196,22 +432,32 @@ class DictionaryMaintenanceTool:
     
     def search_entries(self, search_term):
         """Search for entries containing the search term"""
+        if self._search_index is None:
+            # Join each entry's casefolded canonical and synonyms into one
+            # haystack (\x01 never occurs in disease names) so the common
+            # miss case costs a single substring check per entry
+            self._search_index = [
+                ('\x01'.join([canonical.lower()]
+                             + [synonym.lower() for synonym in entry.synonyms]),
+                 canonical, entry)
+                for canonical, entry in self.dictionary.items()
+            ]
+
         matches = []
         search_lower = search_term.lower()
-        
-        for canonical, entry in self.dictionary.items():
-            # Search in canonical name
+
+        for haystack, canonical, entry in self._search_index:
+            if search_lower not in haystack:
+                continue
+            # Hits are rare; only then work out where the match was
             if search_lower in canonical.lower():
                 matches.append((canonical, entry, 'canonical'))
                 continue
-            
-            # Search in synonyms
-            synonyms = entry.get('synonyms', [])
-            for synonym in synonyms:
+            for synonym in entry.synonyms:
                 if search_lower in synonym.lower():
                     matches.append((canonical, entry, f'synonym: {synonym}'))
                     break
-        
+
         return matches
     
     def print_search_results(self, search_term):
@@ -222,13 +468,13 @@ class DictionaryMaintenanceTool:
         print("-" * 60)
         
         for canonical, entry, match_type in matches[:20]:  # Limit to 20 results
-            freq = entry.get('frequency', 0)
-            variations = entry.get('variations_merged', 0)
+            freq = entry.frequency
+            variations = entry.variations_merged
             print(f"\n📌 {canonical}")
             print(f"   Frequency: {freq}, Variations: {variations}")
             print(f"   Match: {match_type}")
-            
-            synonyms = entry.get('synonyms', [])
+
+            synonyms = entry.synonyms
             if len(synonyms) > 1:
                 print(f"   Synonyms: {', '.join(synonyms[1:3])}{'...' if len(synonyms) > 3 else ''}")
         
@@ -243,10 +489,9 @@ class DictionaryMaintenanceTool:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_path = backup_dir / f"dictionary_backup_{timestamp}.jsonl"
         
-        # Copy current dictionary
-        with open(self.dictionary_path, 'r', encoding='utf-8') as src:
-            with open(backup_path, 'w', encoding='utf-8') as dst:
-                dst.write(src.read())
+        # Copy current dictionary; shutil uses zero-copy syscalls where
+        # available instead of decoding the file into a Python string
+        shutil.copyfile(self.dictionary_path, backup_path)
         
         print(f"\n💾 Dictionary backed up to: {backup_path}")
         return backup_path
@@ -1,9 +1,17 @@
+import heapq
 import json
 import re
 import logging
+from collections import namedtuple
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 
+try:
+    import orjson  # optional: C JSON codec, UTF-8 native
+except ImportError:
+    orjson = None
+
 # Setup logging
 Path('logs').mkdir(exist_ok=True)
 log_filename = f"logs/dictionary_update_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
@@ -17,40 +25,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# A new-words row parsed once; attribute access in the update loop is
+# cheaper than repeated dict.get calls with defaults
+NewEntry = namedtuple(
+    'NewEntry',
+    ['canonical_ja', 'frequency', 'synonyms', 'canonical_en', 'category', 'regex'])
+
 class DictionaryUpdater:
     def __init__(self, original_dict_path='final_output/disease_dictionary_v2.jsonl'):
         self.original_dict_path = original_dict_path
         self.dictionary = self.load_dictionary()
         self.new_entries_added = 0
         self.existing_updated = 0
+        self._now_iso = datetime.now().isoformat()
         
     def load_dictionary(self):
         """Load existing dictionary"""
-        dictionary = {}
-        with open(self.original_dict_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                entry = json.loads(line)
-                canonical = entry['canonical_ja']
-                dictionary[canonical] = entry
+        loads = orjson.loads if orjson is not None else json.loads
+        entries = [
+            loads(line)
+            for line in Path(self.original_dict_path).read_bytes().splitlines()
+            if line
+        ]
+        dictionary = {entry['canonical_ja']: entry for entry in entries}
+        # Non-persisted membership set so synonym dedup is O(1) per
+        # check instead of rebuilding a set on every update
+        for entry in dictionary.values():
+            entry['_syn_set'] = set(entry.get('synonyms', []))
         logger.info(f"Loaded {len(dictionary)} existing entries")
         return dictionary
     
     def update_from_new_words(self, new_words_path='new_words.jsonl'):
         """Update dictionary with entries from new words file"""
         logger.info(f"Updating dictionary from: {new_words_path}")
+        # One timestamp per run: every entry added by this update shares
+        # it, instead of a clock read and isoformat call per entry
+        self._now_iso = datetime.now().isoformat()
         
-        new_entries = []
-        with open(new_words_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                entry = json.loads(line)
-                new_entries.append(entry)
-        
+        loads = orjson.loads if orjson is not None else json.loads
+        new_entries = [
+            NewEntry(
+                raw['canonical_ja'],
+                raw.get('frequency', 1),
+                raw.get('synonyms', ()),
+                raw.get('canonical_en', ''),
+                raw.get('category', 'Disease'),
+                raw.get('regex'),
+            )
+            for raw in (
+                loads(line)
+                for line in Path(new_words_path).read_bytes().splitlines()
+                if line
+            )
+        ]
+
         logger.info(f"Found {len(new_entries)} potential new entries")
-        
+
         # Process each new entry
         for entry in new_entries:
-            canonical = entry['canonical_ja']
-            
+            canonical = entry.canonical_ja
+
             if canonical in self.dictionary:
                 # Update existing entry
                 self.update_existing_entry(canonical, entry)
@@ -64,41 +98,48 @@ class DictionaryUpdater:
     def update_existing_entry(self, canonical, new_entry):
         """Update an existing dictionary entry"""
         existing = self.dictionary[canonical]
-        
+        touched = False
+
         # Update frequency if higher
-        if new_entry['frequency'] > existing.get('frequency', 0):
-            existing['frequency'] = new_entry['frequency']
-            logger.info(f"Updated frequency for '{canonical}': {new_entry['frequency']}")
-            self.existing_updated += 1
-        
+        if new_entry.frequency > existing.get('frequency', 0):
+            existing['frequency'] = new_entry.frequency
+            logger.info(f"Updated frequency for '{canonical}': {new_entry.frequency}")
+            touched = True
+
         # Add new synonyms if not already present
-        existing_synonyms = set(existing.get('synonyms', []))
-        new_synonyms = set(new_entry.get('synonyms', []))
-        
-        added_synonyms = new_synonyms - existing_synonyms
+        syn_set = existing['_syn_set']
+        added_synonyms = [
+            synonym for synonym in new_entry.synonyms
+            if synonym not in syn_set
+        ]
         if added_synonyms:
-            existing['synonyms'].extend(list(added_synonyms))
+            existing['synonyms'].extend(added_synonyms)
+            syn_set.update(added_synonyms)
             logger.info(f"Added synonyms to '{canonical}': {added_synonyms}")
-            if canonical not in [entry['canonical_ja'] for entry in [new_entry] if self.existing_updated == 0]:
-                self.existing_updated += 1
+            touched = True
+
+        # Count each entry once no matter how many fields changed
+        if touched:
+            self.existing_updated += 1
     
     def add_new_entry(self, entry):
         """Add a new entry to the dictionary"""
-        canonical = entry['canonical_ja']
-        
+        canonical = entry.canonical_ja
+
         # Create a proper dictionary entry
         dict_entry = {
             "canonical_ja": canonical,
-            "canonical_en": entry.get('canonical_en', ''),
-            "category": entry.get('category', 'Disease'),
-            "synonyms": entry.get('synonyms', [canonical]),
-            "regex": entry.get('regex', re.escape(canonical)),
-            "frequency": entry.get('frequency', 1),
+            "canonical_en": entry.canonical_en,
+            "category": entry.category,
+            "synonyms": list(entry.synonyms) if entry.synonyms else [canonical],
+            "regex": entry.regex if entry.regex is not None else re.escape(canonical),
+            "frequency": entry.frequency,
             "variations_merged": 0,
             "status": "newly_added",
-            "added_date": datetime.now().isoformat()
+            "added_date": self._now_iso
         }
-        
+        dict_entry['_syn_set'] = set(dict_entry['synonyms'])
+
         self.dictionary[canonical] = dict_entry
         self.new_entries_added += 1
         logger.info(f"Added new entry: '{canonical}' (freq: {dict_entry['frequency']})")
@@ -115,17 +156,32 @@ class DictionaryUpdater:
             else:
                 output_path = base_path + '_updated.jsonl'
         
-        # Sort entries by frequency
-        sorted_entries = sorted(
-            self.dictionary.values(),
-            key=lambda x: x.get('frequency', 0),
-            reverse=True
-        )
+        # Sort entries by frequency; decorating with the frequency and
+        # keying on itemgetter(0) reads each frequency once and keeps
+        # the comparisons in C instead of a Python lambda per element
+        decorated = [
+            (entry.get('frequency', 0), entry)
+            for entry in self.dictionary.values()
+        ]
+        decorated.sort(key=itemgetter(0), reverse=True)
+        sorted_entries = [entry for _, entry in decorated]
         
-        # Save as JSON Lines
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for entry in sorted_entries:
-                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        # Drop non-persisted helper keys (like _syn_set) before writing
+        cleaned = [
+            {k: v for k, v in entry.items() if not k.startswith('_')}
+            for entry in sorted_entries
+        ]
+
+        # Serialize everything into one bytes buffer and write it in a
+        # single call instead of a small write per entry
+        if orjson is not None:
+            payload = b'\n'.join(orjson.dumps(e) for e in cleaned) + b'\n'
+        else:
+            payload = '\n'.join(
+                json.dumps(e, ensure_ascii=False) for e in cleaned
+            ).encode('utf-8') + b'\n'
+        with open(output_path, 'wb') as f:
+            f.write(payload)
         
         logger.info(f"Saved updated dictionary with {len(sorted_entries)} entries to: {output_path}")
         
@@ -146,20 +202,26 @@ class DictionaryUpdater:
             "top_new_entries": []
         }
         
-        # Get top new entries by frequency
-        new_entries = [
-            entry for entry in self.dictionary.values() 
-            if entry.get('status') == 'newly_added'
+        # Get top new entries by frequency; nlargest keeps a 10-element
+        # heap instead of sorting every new entry, and the decorated
+        # tuples let it key through itemgetter rather than a lambda
+        top_new = [
+            entry for _, entry in heapq.nlargest(
+                10,
+                ((entry.get('frequency', 0), entry)
+                 for entry in self.dictionary.values()
+                 if entry.get('status') == 'newly_added'),
+                key=itemgetter(0)
+            )
         ]
-        new_entries.sort(key=lambda x: x.get('frequency', 0), reverse=True)
-        
+
         summary["top_new_entries"] = [
             {
                 "canonical_ja": entry['canonical_ja'],
                 "frequency": entry['frequency'],
                 "synonyms_count": len(entry.get('synonyms', []))
             }
-            for entry in new_entries[:10]
+            for entry in top_new
         ]
         
         # Save summary